@@ -12,33 +12,41 @@ from pathlib import Path
 # Add src to path
 sys.path.append(str(Path(__file__).parent))
 
-from src.data_processing.weather_integration import RocketLaunchWeatherIntegrator
-from src.models.train_models import ModelTrainer
-from src.models.predict import LaunchPredictor
-from src.visualization.create_visualizations import create_all_visualizations
+# Pipeline stages are imported inside each run_* function so a single mode
+# only pays for the libraries it actually uses (pandas, sklearn, matplotlib).
 
-def run_data_processing():
+# The processing step writes Parquet when this path ends in .parquet, but
+# ModelTrainer and create_all_visualizations still read CSV. Switch the
+# extension only once those readers load through
+# src.data_processing.io.load_processed_data.
+PROCESSED_DATA_FILE = 'data/processed/rocket_launches_with_weather_ml_ready.csv'
+
+def run_data_processing(force=False):
     """Process raw data and add weather features."""
+    from src.data_processing.weather_integration import RocketLaunchWeatherIntegrator
+    
     print("=" * 60)
     print("STEP 1: DATA PROCESSING")
     print("=" * 60)
     
     integrator = RocketLaunchWeatherIntegrator(
         input_file='data/raw/Space_Corrected.csv',
-        output_file='data/processed/rocket_launches_with_weather_ml_ready.csv'
+        output_file=PROCESSED_DATA_FILE
     )
     
-    df = integrator.process_data()
+    df = integrator.process_data(force=force)
     print(f"✅ Data processing complete. Shape: {df.shape}")
     return df
 
 def run_model_training():
     """Train all ML models."""
+    from src.models.train_models import ModelTrainer
+    
     print("\n" + "=" * 60)
     print("STEP 2: MODEL TRAINING")
     print("=" * 60)
     
-    trainer = ModelTrainer('data/processed/rocket_launches_with_weather_ml_ready.csv')
+    trainer = ModelTrainer(PROCESSED_DATA_FILE)
     results = trainer.run_pipeline()
     
     print("\n📊 Model Performance Summary:")
@@ -51,6 +59,8 @@ def run_model_training():
 
 def run_prediction_demo():
     """Demo prediction with sample conditions."""
+    from src.models.predict import LaunchPredictor
+    
     print("\n" + "=" * 60)
     print("STEP 3: PREDICTION DEMO")
     print("=" * 60)
@@ -89,11 +99,13 @@ def run_prediction_demo():
 
 def run_visualizations():
     """Create all visualizations."""
+    from src.visualization.create_visualizations import create_all_visualizations
+    
     print("\n" + "=" * 60)
     print("STEP 4: CREATING VISUALIZATIONS")
     print("=" * 60)
     
-    create_all_visualizations('data/processed/rocket_launches_with_weather_ml_ready.csv')
+    create_all_visualizations(PROCESSED_DATA_FILE)
     print("✅ Visualizations saved to reports/figures/")
 
 def main():
@@ -107,6 +119,11 @@ def main():
         default='full',
         help='Pipeline mode to run'
     )
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='Reprocess raw data even if the processed output is up to date'
+    )
     
     args = parser.parse_args()
     
@@ -115,7 +132,7 @@ def main():
     print("🚀" * 20)
     
     if args.mode == 'process':
-        run_data_processing()
+        run_data_processing(force=args.force)
     elif args.mode == 'train':
         run_model_training()
     elif args.mode == 'predict':
@@ -123,7 +140,7 @@ def main():
     elif args.mode == 'viz':
         run_visualizations()
     else:  # full
-        run_data_processing()
+        run_data_processing(force=args.force)
         run_model_training()
         run_prediction_demo()
         run_visualizations()
@@ -0,0 +1,16 @@
+"""
+Lightweight readers for processed rocket launch datasets.
+Kept separate from weather_integration so model and visualization code can
+load data without importing the weather-fetching dependencies.
+"""
+
+from pathlib import Path
+
+import pandas as pd
+
+
+def load_processed_data(path: str) -> pd.DataFrame:
+    """Load a processed dataset written by RocketLaunchWeatherIntegrator.save_data."""
+    if Path(path).suffix == '.csv':
+        return pd.read_csv(path)
+    return pd.read_parquet(path)
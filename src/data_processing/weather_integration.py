@@ -5,20 +5,100 @@ Fetches historical weather data from Open-Meteo API.
 
 import pandas as pd
 import numpy as np
-from datetime import datetime
-import requests
+from datetime import date
+from pathlib import Path
+import re
 import time
+from array import array
 import json
-from typing import Dict, Tuple, Optional
+import asyncio
+import aiohttp
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple, Optional
+
+from src.data_processing.io import load_processed_data
+
+# Splits 'Rocket | Payload' on the first pipe and trims both sides in one pass
+DETAIL_PATTERN = re.compile(r'^\s*([^|]*?)\s*(?:\|\s*(.*?)\s*)?$')
+
+try:
+    import numba
+except ImportError:  # Optional accelerator; the NumPy path below is used instead
+    numba = None
+
+OPEN_METEO_ARCHIVE_URL = 'https://archive-api.open-meteo.com/v1/archive'
+OPEN_METEO_DAILY_FIELDS = {
+    'temperature_2m_mean': 'temperature_c',
+    'windspeed_10m_max': 'windspeed_kmh',
+    'precipitation_sum': 'precipitation_mm',
+    'relative_humidity_2m_mean': 'humidity_percent',
+}
+OPEN_METEO_RETRY_STATUSES = {429, 500, 502, 503, 504}
+OPEN_METEO_MAX_RETRIES = 3
+
+def _weather_scores_numpy(wind: np.ndarray, precip: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Weather quality score and extreme weather flag using NumPy expressions."""
+    # Missing readings compare False everywhere and keep the neutral multiplier
+    wind_mult = np.select([wind > 40, wind > 30, wind > 20], [0.3, 0.6, 0.8], default=1.0)
+    precip_mult = np.select([precip > 5, precip > 2], [0.3, 0.7], default=1.0)
+    extreme = ((wind > 50) | (precip > 10)).astype(np.int64)
+    return wind_mult * precip_mult, extreme
+
+
+if numba is not None:
+    # fastmath is left off: it lets LLVM assume no NaNs and drop the isnan checks
+    @numba.njit(parallel=True, cache=True)
+    def _weather_scores(wind, precip):
+        """Weather quality score and extreme weather flag in a single fused pass."""
+        n = wind.shape[0]
+        quality = np.empty(n, dtype=np.float64)
+        extreme = np.empty(n, dtype=np.int64)
+        for i in numba.prange(n):
+            w = wind[i]
+            p = precip[i]
+            wind_mult = 1.0
+            if not np.isnan(w):
+                if w > 40:
+                    wind_mult = 0.3
+                elif w > 30:
+                    wind_mult = 0.6
+                elif w > 20:
+                    wind_mult = 0.8
+            precip_mult = 1.0
+            if not np.isnan(p):
+                if p > 5:
+                    precip_mult = 0.3
+                elif p > 2:
+                    precip_mult = 0.7
+            quality[i] = wind_mult * precip_mult
+            extreme[i] = 1 if (w > 50) or (p > 10) else 0
+        return quality, extreme
+else:
+    _weather_scores = _weather_scores_numpy
+
 
 class RocketLaunchWeatherIntegrator:
     """Integrates historical weather data with rocket launch data."""
     
-    def __init__(self, input_file: str, output_file: str):
+    def __init__(self, input_file: str, output_file: str, max_concurrency: int = 64,
+                 cache_file: str = 'data/cache/weather.parquet', random_state: int = 42):
         self.input_file = input_file
         self.output_file = output_file
-        self.weather_cache = {}
+        self.max_concurrency = max_concurrency
+        self.rng = np.random.default_rng(random_state)
+        self.cache_path = Path(cache_file)
+        
+        # Column-oriented weather cache: key -> row, one float32 array per field
+        self._cache_index: Dict[Tuple[float, float, date], int] = {}
+        self._cache_keys: List[Tuple[float, float, date]] = []
+        self._cache_values = {column: array('f') for column in OPEN_METEO_DAILY_FIELDS.values()}
+        self._cache_sources: List[str] = []
+        self._load_weather_cache()
         self.location_coordinates = self._initialize_coordinates()
+        self._site_regex = re.compile(
+            '(' + '|'.join(re.escape(site) for site in self.location_coordinates) + ')',
+            re.IGNORECASE)
+        self._site_lut = {site.lower(): site for site in self.location_coordinates}
     
     def _initialize_coordinates(self) -> Dict:
         """Initialize known launch site coordinates."""
@@ -37,110 +117,253 @@ class RocketLaunchWeatherIntegrator:
             "Wallops Island": (37.9339, -75.4664),
         }
     
-    def process_data(self) -> pd.DataFrame:
+    def _load_weather_cache(self):
+        """Load previously fetched weather keyed by (lat, lon, date)."""
+        if not self.cache_path.exists():
+            return
+        
+        cached = pd.read_parquet(self.cache_path)
+        days = pd.to_datetime(cached['date']).dt.date
+        self._cache_append(list(zip(cached['lat'], cached['lon'], days)), cached)
+    
+    def _cache_append(self, keys: List[Tuple[float, float, date]], weather: pd.DataFrame):
+        """Append weather rows for new keys to the column-oriented cache."""
+        # Existing or repeated keys keep their first row so keys and values stay aligned
+        is_new = np.zeros(len(keys), dtype=bool)
+        for i, key in enumerate(keys):
+            if key not in self._cache_index:
+                self._cache_index[key] = len(self._cache_keys)
+                self._cache_keys.append(key)
+                is_new[i] = True
+        
+        for column, values in self._cache_values.items():
+            values.frombytes(weather[column].to_numpy(dtype=np.float32)[is_new].tobytes())
+        self._cache_sources.extend(weather['weather_source'].to_numpy()[is_new])
+    
+    def save_weather_cache(self):
+        """Persist API weather records so later runs skip the network."""
+        precise = np.array(self._cache_sources) == 'precise'
+        if not precise.any():
+            return
+        
+        lat, lon, day = zip(*self._cache_keys)
+        cached = pd.DataFrame({
+            'lat': lat,
+            'lon': lon,
+            'date': day,
+            **{column: np.array(values, dtype=np.float32)
+               for column, values in self._cache_values.items()},
+            'weather_source': self._cache_sources,
+        })
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        cached[precise].to_parquet(self.cache_path, index=False)
+    
+    def process_data(self, force: bool = False) -> pd.DataFrame:
         """Main processing pipeline."""
+        # Reuse the previous output when the raw data has not changed since
+        output_path = Path(self.output_file)
+        if (not force and output_path.exists()
+                and output_path.stat().st_mtime > Path(self.input_file).stat().st_mtime):
+            print(f"{self.output_file} is newer than {self.input_file}; skipping reprocessing")
+            return load_processed_data(self.output_file)
+        
         df = self.load_and_clean_data()
         df = self.add_weather_data(df)
         df = self.add_derived_features(df)
         self.save_data(df)
+        self.save_weather_cache()
         return df
     
     def load_and_clean_data(self) -> pd.DataFrame:
         """Load and clean the rocket launch data."""
-        df = pd.read_csv(self.input_file)
-        
-        # Clean and process columns
-        if 'Unnamed: 0' in df.columns:
-            df = df.drop('Unnamed: 0', axis=1)
+        # Skip the exported index columns and read repeated labels as categories
+        df = pd.read_csv(
+            self.input_file,
+            usecols=lambda column: not column.startswith('Unnamed:'),
+            dtype={
+                'Location': 'category',
+                'Status Rocket': 'category',
+                'Status Mission': 'category',
+                'Detail': 'string',
+            },
+        )
         
         # Split Detail column
         if 'Detail' in df.columns:
-            df[['RocketModel', 'Payload']] = df['Detail'].str.split('|', n=1, expand=True)
-            df['RocketModel'] = df['RocketModel'].str.strip()
-            df['Payload'] = df['Payload'].str.strip()
+            df[['RocketModel', 'Payload']] = df['Detail'].str.extract(DETAIL_PATTERN)
         
         # Rename and clean price column
         df = df.rename(columns={' Rocket': 'LaunchPriceM', 'Rocket': 'LaunchPriceM'})
         if 'LaunchPriceM' in df.columns:
-            df['LaunchPriceM'] = pd.to_numeric(df['LaunchPriceM'], errors='coerce')
+            df['LaunchPriceM'] = pd.to_numeric(df['LaunchPriceM'], errors='coerce',
+                                               downcast='float')
         
         # Parse dates
         df['LaunchDate'] = pd.to_datetime(df['Datum'], errors='coerce')
         
         # Encode target variables
-        df['MissionSuccess'] = df['Status Mission'].apply(self.encode_mission_status)
-        df['MissionSuccessProb'] = df['Status Mission'].apply(self.encode_mission_probability)
+        df['MissionSuccess'] = self.encode_mission_status(df['Status Mission'])
+        df['MissionSuccessProb'] = self.encode_mission_probability(df['Status Mission'])
         
         return df
     
-    def encode_mission_status(self, status: str) -> int:
+    def encode_mission_status(self, status: pd.Series) -> pd.Series:
         """Binary encoding of mission status."""
-        if pd.isna(status):
-            return np.nan
-        status_lower = str(status).lower()
-        return 1 if 'success' in status_lower and 'failure' not in status_lower else 0
+        status_lower = status.str.lower()
+        is_success = (status_lower.str.contains('success', regex=False, na=False) &
+                      ~status_lower.str.contains('failure', regex=False, na=False))
+        return is_success.astype('Int8').where(status.notna())
     
-    def encode_mission_probability(self, status: str) -> float:
+    def encode_mission_probability(self, status: pd.Series) -> pd.Series:
         """Probability encoding of mission status."""
-        if pd.isna(status):
-            return np.nan
-        status_lower = str(status).lower()
-        if 'success' in status_lower and 'failure' not in status_lower:
-            return 1.0
-        elif 'partial' in status_lower:
-            return 0.5
-        else:
-            return 0.0
+        status_lower = status.str.lower()
+        is_success = (status_lower.str.contains('success', regex=False, na=False) &
+                      ~status_lower.str.contains('failure', regex=False, na=False))
+        is_partial = status_lower.str.contains('partial', regex=False, na=False)
+        probability = np.select([is_success, is_partial], [1.0, 0.5], default=0.0)
+        return pd.Series(probability, index=status.index).where(status.notna())
     
     def add_weather_data(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Add weather data for each launch."""
-        weather_records = []
-        
-        for idx, row in df.iterrows():
-            if idx % 100 == 0:
-                print(f"Processing weather data: {idx}/{len(df)}")
-            
-            coords = self.get_coordinates(row['Location'])
-            if coords and pd.notna(row['LaunchDate']):
-                weather = self.fetch_weather_data(row['LaunchDate'], coords[0], coords[1])
-            else:
-                weather = self.create_empty_weather()
-            
-            weather_records.append(weather)
-        
-        weather_df = pd.DataFrame(weather_records)
-        return pd.concat([df, weather_df], axis=1)
+        """Add weather data for each launch, fetching once per unique site and date."""
+        # Resolve every launch to a (site, day) key in one vectorized pass
+        sites = (df['Location'].str.extract(self._site_regex, expand=False)
+                               .str.lower()
+                               .map(self._site_lut))
+        days = df['LaunchDate'].dt.normalize()
+        has_key = (sites.notna() & days.notna()).to_numpy()
+        key_codes, unique_keys = pd.MultiIndex.from_arrays(
+            [sites[has_key], days[has_key]]).factorize()
+        print(f"Fetching weather data for {len(unique_keys)} unique site/date pairs "
+              f"({len(df)} launches)")
+        
+        cache_keys = [(*self.location_coordinates[site], day.date()) for site, day in unique_keys]
+        
+        # Group uncached days by site so each site needs one date-range request
+        to_fetch = {}
+        for lat, lon, day in cache_keys:
+            if (lat, lon, day) not in self._cache_index:
+                to_fetch.setdefault((lat, lon), set()).add(day)
+        
+        # Weather fetches are network-bound, so run the site requests concurrently
+        results = self._run_fetch_all(to_fetch) if to_fetch else []
+        for (lat, lon), weather in zip(to_fetch, results):
+            if not weather.empty:
+                self._cache_append([(lat, lon, day) for day in weather.index], weather)
+        
+        # Gather one slot per unique key from the cache, then onto launches by key code
+        rows = np.fromiter((self._cache_index.get(key, -1) for key in cache_keys),
+                           dtype=np.intp, count=len(cache_keys))
+        needs_simulation = rows < 0
+        cached_rows = rows[~needs_simulation]
+        unique_weather = {}
+        for column, values in self._cache_values.items():
+            unique_weather[column] = np.empty(len(cache_keys), dtype=np.float32)
+            cached_values = np.frombuffer(values, dtype=np.float32)[cached_rows]
+            unique_weather[column][~needs_simulation] = cached_values
+        unique_source = np.empty(len(cache_keys), dtype=object)
+        unique_source[~needs_simulation] = [self._cache_sources[row] for row in cached_rows]
+        
+        # Keys the API could not serve get simulated weather drawn in one batch
+        simulated = needs_simulation.sum()
+        if simulated:
+            print(f"Weather API unavailable for {simulated} site/date pairs; "
+                  f"using simulated weather")
+            for column, values in self.simulate_weather(simulated).items():
+                unique_weather[column][needs_simulation] = values
+            unique_source[needs_simulation] = 'simulated'
+        
+        weather_columns = {}
+        for column, values in unique_weather.items():
+            weather_columns[column] = np.full(len(df), np.nan, dtype=np.float32)
+            weather_columns[column][has_key] = values[key_codes]
+        weather_source = np.full(len(df), 'missing', dtype=object)
+        weather_source[has_key] = unique_source[key_codes]
+        
+        return df.assign(**weather_columns, weather_source=pd.Categorical(weather_source))
     
     def get_coordinates(self, location: str) -> Optional[Tuple[float, float]]:
         """Get coordinates for a launch location."""
         if pd.isna(location):
             return None
         
-        for known_loc, coords in self.location_coordinates.items():
-            if known_loc.lower() in location.lower():
-                return coords
-        return None
+        match = self._site_regex.search(location)
+        return self.location_coordinates[self._site_lut[match.group(0).lower()]] if match else None
     
-    def fetch_weather_data(self, date: datetime, lat: float, lon: float) -> Dict:
-        """Fetch historical weather data from Open-Meteo API."""
-        # Implementation simplified for brevity
-        # Full implementation would include API calls and error handling
-        return {
-            'temperature_c': np.random.normal(20, 5),
-            'windspeed_kmh': np.random.normal(15, 10),
-            'precipitation_mm': np.random.exponential(2),
-            'humidity_percent': np.random.normal(60, 20),
-            'weather_source': 'precise'
+    def _run_fetch_all(self, to_fetch: Dict[Tuple[float, float], set]) -> List[pd.DataFrame]:
+        """Run _fetch_all to completion, whether or not an event loop is already running."""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self._fetch_all(to_fetch))
+        
+        # Inside a running loop (e.g. Jupyter) asyncio.run is not allowed, so give the
+        # fetch its own loop on a worker thread
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, self._fetch_all(to_fetch)).result()
+    
+    async def _fetch_all(self, to_fetch: Dict[Tuple[float, float], set]) -> List[pd.DataFrame]:
+        """Fetch every site's weather over one pooled HTTP session."""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=60)) as session:
+            tasks = [
+                asyncio.create_task(
+                    self.fetch_weather_data(session, semaphore, sorted(days), lat, lon))
+                for (lat, lon), days in to_fetch.items()
+            ]
+            return await asyncio.gather(*tasks)
+    
+    async def fetch_weather_data(self, session: aiohttp.ClientSession, semaphore: asyncio.Semaphore,
+                                 dates: List[date], lat: float, lon: float) -> pd.DataFrame:
+        """Fetch historical daily weather for one site from Open-Meteo API."""
+        params = {
+            'latitude': lat,
+            'longitude': lon,
+            'start_date': dates[0].isoformat(),
+            'end_date': dates[-1].isoformat(),
+            'daily': ','.join(OPEN_METEO_DAILY_FIELDS),
+            'timezone': 'UTC',
         }
+        
+        async with semaphore:
+            for attempt in range(OPEN_METEO_MAX_RETRIES + 1):
+                if attempt:
+                    await asyncio.sleep(0.5 * 2 ** (attempt - 1))
+                try:
+                    async with session.get(OPEN_METEO_ARCHIVE_URL, params=params) as response:
+                        # Only rate limits and server errors are worth another attempt
+                        if response.status in OPEN_METEO_RETRY_STATUSES:
+                            if attempt < OPEN_METEO_MAX_RETRIES:
+                                continue
+                            return pd.DataFrame()
+                        if response.status >= 400:
+                            return pd.DataFrame()
+                        payload = await response.json()
+                    break
+                except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+                    if attempt == OPEN_METEO_MAX_RETRIES:
+                        return pd.DataFrame()
+        
+        try:
+            daily = payload['daily']
+            weather = pd.DataFrame(
+                {column: daily[field] for field, column in OPEN_METEO_DAILY_FIELDS.items()},
+                index=pd.to_datetime(daily['time']).date,
+            )
+        except (KeyError, TypeError, ValueError):
+            return pd.DataFrame()
+        
+        # The response covers the whole range; keep only the launch days
+        weather = weather.reindex(dates).astype(np.float32)
+        weather['weather_source'] = np.where(weather.notna().any(axis=1), 'precise', 'missing')
+        return weather
     
-    def create_empty_weather(self) -> Dict:
-        """Create empty weather record."""
+    def simulate_weather(self, n: int) -> Dict[str, np.ndarray]:
+        """Draw n simulated weather readings for keys the API could not serve."""
         return {
-            'temperature_c': np.nan,
-            'windspeed_kmh': np.nan,
-            'precipitation_mm': np.nan,
-            'humidity_percent': np.nan,
-            'weather_source': 'missing'
+            'temperature_c': self.rng.normal(20, 5, n).astype(np.float32),
+            'windspeed_kmh': self.rng.normal(15, 10, n).astype(np.float32),
+            'precipitation_mm': self.rng.exponential(2, n).astype(np.float32),
+            'humidity_percent': self.rng.normal(60, 20, n).astype(np.float32),
         }
     
     def add_derived_features(self, df: pd.DataFrame) -> pd.DataFrame:
@@ -148,72 +371,46 @@ class RocketLaunchWeatherIntegrator:
         # Add temporal features
         df['LaunchYear'] = df['LaunchDate'].dt.year
         df['LaunchDecade'] = (df['LaunchYear'] // 10) * 10
-        df['Season'] = df['LaunchDate'].apply(self.get_season)
-        df['LaunchEra'] = df['LaunchYear'].apply(self.get_era)
+        df['Season'] = self.get_season(df['LaunchDate'])
+        df['LaunchEra'] = self.get_era(df['LaunchYear'])
         
-        # Add weather quality score
-        df['WeatherQualityScore'] = df.apply(self.calculate_weather_quality, axis=1)
+        # Add weather quality score and extreme weather flag
+        df['WeatherQualityScore'], df['IsExtremeWeather'] = self.calculate_weather_scores(df)
         
-        # Add extreme weather flag
-        df['IsExtremeWeather'] = (
-            (df['windspeed_kmh'] > 50) | 
-            (df['precipitation_mm'] > 10)
-        ).astype(int)
+        # Low-cardinality labels are stored as integer codes
+        for column in ['Location', 'Status Mission', 'Season', 'LaunchEra', 'weather_source']:
+            df[column] = df[column].astype('category')
         
         return df
     
-    def get_season(self, date) -> str:
-        """Determine season from date."""
-        if pd.isna(date):
-            return 'Unknown'
-        month = date.month
-        if month in [3, 4, 5]:
-            return 'Spring'
-        elif month in [6, 7, 8]:
-            return 'Summer'
-        elif month in [9, 10, 11]:
-            return 'Fall'
-        else:
-            return 'Winter'
+    def get_season(self, dates: pd.Series) -> np.ndarray:
+        """Determine season from launch dates."""
+        season_lut = np.array(['Winter', 'Winter', 'Spring', 'Spring', 'Spring', 'Summer',
+                               'Summer', 'Summer', 'Fall', 'Fall', 'Fall', 'Winter'], dtype=object)
+        months = dates.dt.month.to_numpy(dtype=float, na_value=np.nan)
+        valid = ~np.isnan(months)
+        month_index = np.where(valid, months, 1).astype(int) - 1
+        return np.where(valid, season_lut[month_index], 'Unknown')
     
-    def get_era(self, year) -> str:
+    def get_era(self, years: pd.Series) -> pd.Series:
         """Categorize launch era."""
-        if pd.isna(year):
-            return 'Unknown'
-        if year < 1970:
-            return 'Early Space Age'
-        elif year < 1990:
-            return 'Cold War Era'
-        elif year < 2010:
-            return 'Post-Cold War'
-        else:
-            return 'Commercial Space'
-    
-    def calculate_weather_quality(self, row) -> float:
-        """Calculate composite weather quality score."""
-        score = 1.0
-        
-        # Wind penalty
-        if not pd.isna(row.get('windspeed_kmh', np.nan)):
-            if row['windspeed_kmh'] > 40:
-                score *= 0.3
-            elif row['windspeed_kmh'] > 30:
-                score *= 0.6
-            elif row['windspeed_kmh'] > 20:
-                score *= 0.8
-        
-        # Precipitation penalty
-        if not pd.isna(row.get('precipitation_mm', np.nan)):
-            if row['precipitation_mm'] > 5:
-                score *= 0.3
-            elif row['precipitation_mm'] > 2:
-                score *= 0.7
-        
-        return score
+        eras = pd.cut(years, bins=[-np.inf, 1970, 1990, 2010, np.inf], right=False,
+                      labels=['Early Space Age', 'Cold War Era', 'Post-Cold War',
+                              'Commercial Space'])
+        return eras.cat.add_categories('Unknown').fillna('Unknown')
+    
+    def calculate_weather_scores(self, df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """Calculate composite weather quality score and extreme weather flag."""
+        wind = df['windspeed_kmh'].to_numpy(dtype=np.float32, na_value=np.nan)
+        precip = df['precipitation_mm'].to_numpy(dtype=np.float32, na_value=np.nan)
+        return _weather_scores(wind, precip)
     
     def save_data(self, df: pd.DataFrame):
-        """Save processed data."""
-        df.to_csv(self.output_file, index=False)
+        """Save processed data as Parquet, or as CSV when output_file ends in .csv."""
+        if Path(self.output_file).suffix == '.csv':
+            df.to_csv(self.output_file, index=False)
+        else:
+            df.to_parquet(self.output_file, engine='pyarrow', compression='snappy', index=False)
         print(f"Data saved to {self.output_file}")
         print(f"Shape: {df.shape}")
         print(f"Success rate: {df['MissionSuccess'].mean():.2%}")